@@ -2,125 +2,241 @@ import streamlit as st
 import yaml
 import os
 import json
+import tempfile
 from copy import deepcopy
+from types import MappingProxyType
 
-# Function to load settings from YAML file
-def load_settings():
-    yaml_path = "augmenta.yaml"
-    default_settings = {
-        "input_csv": "data/input.csv",
-        "output_csv": "data/output.csv",
-        "model": {
-            "provider": "openai",
-            "name": "gpt-4o-mini"
-        },
-        "search": {
-            "engine": "google",
-            "results": 10
-        },
-        "prompt": {
-            "system": "You are an expert researcher.",
-            "user": "# Instructions\n\nResearch the following entity..."
-        },
-        "structure": {
-            "industry": {
-                "type": "str",
-                "description": "What industry is this organisation or person associated with?",
-                "options": ["Agriculture, Forestry and Fishing", "Manufacturing", "Other"]
-            },
-            "explanation": {
-                "type": "str",
-                "description": "A brief explanation"
-            }
+# Prefer the libyaml C bindings when available
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+PROVIDERS = ("openai", "google", "azure", "anthropic")
+PROVIDER_IDX = {p: i for i, p in enumerate(PROVIDERS)}
+SEARCH_ENGINES = ("google", "bing", "duckduckgo", "brave")
+SEARCH_ENGINE_IDX = {e: i for i, e in enumerate(SEARCH_ENGINES)}
+
+# Shared read-only fallback for missing settings sections
+_EMPTY = MappingProxyType({})
+
+# Defaults used when the settings file is missing or empty
+_DEFAULT_SETTINGS = {
+    "input_csv": "data/input.csv",
+    "output_csv": "data/output.csv",
+    "model": {
+        "provider": "openai",
+        "name": "gpt-4o-mini"
+    },
+    "search": {
+        "engine": "google",
+        "results": 10
+    },
+    "prompt": {
+        "system": "You are an expert researcher.",
+        "user": "# Instructions\n\nResearch the following entity..."
+    },
+    "structure": {
+        "industry": {
+            "type": "str",
+            "description": "What industry is this organisation or person associated with?",
+            "options": ["Agriculture, Forestry and Fishing", "Manufacturing", "Other"]
         },
-        "examples": [],
-        "logfire": False
-    }
+        "explanation": {
+            "type": "str",
+            "description": "A brief explanation"
+        }
+    },
+    "examples": [],
+    "logfire": False
+}
+
+# Pre-split dotted setting keys accepted by update_setting
+SETTING_PATHS = {
+    "input_csv": ("input_csv",),
+    "output_csv": ("output_csv",),
+    "model.provider": ("model", "provider"),
+    "model.name": ("model", "name"),
+    "search.engine": ("search", "engine"),
+    "search.results": ("search", "results"),
+    "prompt.system": ("prompt", "system"),
+    "prompt.user": ("prompt", "user"),
+    "logfire": ("logfire",),
+}
+
+# Settings are persisted as JSON; YAML is only used for the raw editor and
+# export/import. The old YAML file is migrated on first load.
+SETTINGS_PATH = "augmenta.json"
+LEGACY_YAML_PATH = "augmenta.yaml"
+
+# Parse a JSON file, cached across reruns and sessions. The mtime and size
+# are part of the cache key so edits on disk invalidate the entry, and
+# st.cache_data hands back a fresh copy on every hit.
+@st.cache_data(max_entries=100)
+def _read_json(settings_path, mtime_ns, size):
+    with open(settings_path, 'r') as file:
+        return json.load(file)
+
+# Serialize settings to YAML for display/download. Cached on settings_key (the
+# settings' JSON form); _settings is not hashed by st.cache_data and is the
+# object actually dumped.
+@st.cache_data(max_entries=100)
+def _dump_yaml(settings_key, _settings):
+    return yaml.dump(_settings, Dumper=Dumper, sort_keys=False)
+
+# Write settings to a temp file and atomically swap it in, so a crash
+# mid-write never leaves a truncated config behind
+def _write_json(settings, settings_path):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(settings_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(settings, file, indent=2, default=str)
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp creates the file as 0600; keep the existing file's mode, or
+        # the umask default for a new file
+        try:
+            mode = os.stat(settings_path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, settings_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# Function to load settings from JSON file. Also records a snapshot of what is
+# on disk, or None when the returned settings were not persisted, so the
+# next flush_settings() writes them.
+def load_settings():
+    settings_path = SETTINGS_PATH
+    st.session_state._saved_snapshot = None
     
-    if os.path.exists(yaml_path):
+    try:
+        stat = os.stat(settings_path)
+    except FileNotFoundError:
+        stat = None
+    
+    if stat is not None:
         try:
-            with open(yaml_path, 'r') as file:
-                loaded_settings = yaml.safe_load(file)
-                if loaded_settings:
-                    return loaded_settings
-                return default_settings
+            loaded_settings = _read_json(settings_path, stat.st_mtime_ns, stat.st_size)
+            if loaded_settings:
+                st.session_state._saved_snapshot = _settings_snapshot(loaded_settings)
+                return loaded_settings
+            return deepcopy(_DEFAULT_SETTINGS)
         except Exception as e:
             st.warning(f"Error loading settings: {e}")
-            return default_settings
+            return deepcopy(_DEFAULT_SETTINGS)
+    elif os.path.exists(LEGACY_YAML_PATH):
+        # Migrate the old YAML settings file to JSON
+        try:
+            with open(LEGACY_YAML_PATH, 'r') as file:
+                loaded_settings = yaml.load(file, Loader=Loader) or deepcopy(_DEFAULT_SETTINGS)
+        except Exception as e:
+            st.warning(f"Error loading settings from {LEGACY_YAML_PATH}: {e}")
+            return deepcopy(_DEFAULT_SETTINGS)
+        try:
+            _write_json(loaded_settings, settings_path)
+            st.session_state._saved_snapshot = _settings_snapshot(loaded_settings)
+        except Exception as e:
+            st.warning(f"Error migrating settings to {settings_path}: {e}")
+        return loaded_settings
     else:
         # Create default settings file if it doesn't exist
+        default_settings = deepcopy(_DEFAULT_SETTINGS)
         try:
-            with open(yaml_path, 'w') as file:
-                yaml.dump(default_settings, file, sort_keys=False)
+            _write_json(default_settings, settings_path)
+            st.session_state._saved_snapshot = _settings_snapshot(default_settings)
             return default_settings
         except Exception as e:
             st.warning(f"Error creating default settings file: {e}")
             return default_settings
 
-# Enhanced function to save settings to YAML file with debug information
+# Enhanced function to save settings to JSON file with debug information
 def save_settings(settings):
-    yaml_path = "augmenta.yaml"
+    settings_path = SETTINGS_PATH
     try:
         # Print debug info
-        st.write(f"Attempting to save to {os.path.abspath(yaml_path)}")
+        st.write(f"Attempting to save to {os.path.abspath(settings_path)}")
         
         # Make sure settings is not None
         if settings is None:
             st.error("Cannot save None settings")
             return False
         
-        # Write to file
-        with open(yaml_path, 'w') as file:
-            yaml.dump(settings, file, sort_keys=False)
-            
-        # Verify file was written
-        if os.path.exists(yaml_path):
-            with open(yaml_path, 'r') as file:
-                content = file.read()
-                if content:
-                    st.success(f"Settings saved successfully! File size: {len(content)} bytes")
-                    return True
-                else:
-                    st.error("File was created but is empty")
-                    return False
-        else:
-            st.error("File was not created")
-            return False
+        _write_json(settings, settings_path)
+        
+        st.session_state._saved_snapshot = _settings_snapshot(settings)
+        st.success(f"Settings saved successfully! File size: {os.path.getsize(settings_path)} bytes")
+        return True
     except Exception as e:
         st.error(f"Error saving settings: {str(e)}")
         return False
 
+# Serialized form of the settings tree, used to skip writes when nothing
+# changed. Uses the same encoding as _write_json so both accept the same
+# trees; no sort_keys, since mixed int/str keys can't be sorted.
+def _settings_snapshot(settings):
+    return json.dumps(settings, default=str)
+
 # Load saved settings at startup
 if 'settings_loaded' not in st.session_state:
     st.session_state.settings = load_settings()
     st.session_state.settings_loaded = True
 
-# Utility function to update and immediately save settings
-def update_and_save(key, value):
-    keys = key.split('.')
+# Single local reference to the live settings for the UI below
+saved_settings = st.session_state.settings
+
+# Set a dotted setting (e.g. "model.name") in memory, creating or replacing
+# parent sections that aren't dicts. flush_settings() writes it to disk.
+def update_setting(key, value):
+    path = SETTING_PATHS.get(key) or tuple(key.split('.'))
     current = st.session_state.settings
     
     # Navigate to the right depth
-    for k in keys[:-1]:
-        if k not in current:
+    for k in path[:-1]:
+        if not isinstance(current.get(k), dict):
             current[k] = {}
         current = current[k]
     
     # Update the value
-    current[keys[-1]] = value
+    current[path[-1]] = value
+
+# Write pending settings to disk, skipping the write if they match the last save
+def flush_settings():
+    settings = st.session_state.settings
+    try:
+        snapshot = _settings_snapshot(settings)
+    except (TypeError, ValueError):
+        # Can't compare; let save_settings try and report the error
+        snapshot = None
+    if snapshot is not None and snapshot == st.session_state.get("_saved_snapshot"):
+        st.info("No changes to save")
+        return True
+    
+    if save_settings(settings):
+        return True
+    return False
+
+# Show/hide button for a heavy section; the body is only built while open
+def _section_open(label, key):
+    open_key = f"_open_{key}"
+    is_open = st.session_state.get(open_key, False)
+    
+    def toggle():
+        st.session_state[open_key] = not is_open
     
-    # Save immediately
-    save_result = save_settings(st.session_state.settings)
-    return save_result
+    st.button(f"{'Hide' if is_open else 'Show'} {label}", key=f"toggle_{key}", on_click=toggle)
+    return is_open
 
 st.title('Augmenta')
 
 # Debug information
 with st.expander("Debug Information"):
     st.write("Current Working Directory:", os.getcwd())
-    st.write("YAML File Path:", os.path.abspath("augmenta.yaml"))
-    st.write("File exists:", os.path.exists("augmenta.yaml"))
-    st.write("Current Settings:", st.session_state.settings)
+    st.write("Settings File Path:", os.path.abspath(SETTINGS_PATH))
+    st.write("File exists:", os.path.exists(SETTINGS_PATH))
+    st.write("Current Settings:", saved_settings)
     
     if st.button("Force Reload Settings"):
         st.session_state.settings = load_settings()
@@ -132,51 +248,49 @@ with st.expander("Basic Configuration", expanded=True):
     col1, col2 = st.columns(2)
     
     with col1:
-        input_csv = st.text_input("Input CSV path", st.session_state.settings.get("input_csv", ""))
+        input_csv = st.text_input("Input CSV path", saved_settings.get("input_csv", ""))
         uploaded_file = st.file_uploader("Or upload a file", type=["csv"])
     
     with col2:
-        output_csv = st.text_input("Output CSV path", st.session_state.settings.get("output_csv", ""))
+        output_csv = st.text_input("Output CSV path", saved_settings.get("output_csv", ""))
     
     if st.button("Save File Paths"):
-        st.session_state.settings["input_csv"] = input_csv
-        st.session_state.settings["output_csv"] = output_csv
-        save_settings(st.session_state.settings)
+        update_setting("input_csv", input_csv)
+        update_setting("output_csv", output_csv)
+        flush_settings()
     
     st.subheader('Model Configuration')
     
     col1, col2 = st.columns(2)
     
-    model_settings = st.session_state.settings.get("model", {})
+    model_settings = saved_settings.get("model") or _EMPTY
     
     with col1:
         model_provider = st.selectbox(
             "Select Model Provider",
-            ["openai", "google", "azure", "anthropic"],
-            index=["openai", "google", "azure", "anthropic"].index(model_settings.get("provider", "openai"))
+            PROVIDERS,
+            index=PROVIDER_IDX.get(model_settings.get("provider", "openai"), 0)
         )
     
     with col2:
         model_name = st.text_input("Model Name", model_settings.get("name", ""))
     
     if st.button("Save Model Settings"):
-        if "model" not in st.session_state.settings:
-            st.session_state.settings["model"] = {}
-        st.session_state.settings["model"]["provider"] = model_provider
-        st.session_state.settings["model"]["name"] = model_name
-        save_settings(st.session_state.settings)
+        update_setting("model.provider", model_provider)
+        update_setting("model.name", model_name)
+        flush_settings()
     
     st.subheader('Search Configuration')
     
     col1, col2 = st.columns(2)
     
-    search_settings = st.session_state.settings.get("search", {})
+    search_settings = saved_settings.get("search") or _EMPTY
     
     with col1:
         search_engine = st.selectbox(
             "Select Search Engine",
-            ["google", "bing", "duckduckgo", "brave"],
-            index=["google", "bing", "duckduckgo", "brave"].index(search_settings.get("engine", "google"))
+            SEARCH_ENGINES,
+            index=SEARCH_ENGINE_IDX.get(search_settings.get("engine", "google"), 0)
         )
     
     with col2:
@@ -186,15 +300,13 @@ with st.expander("Basic Configuration", expanded=True):
                                           value=int(search_settings.get("results", 10)))
     
     if st.button("Save Search Settings"):
-        if "search" not in st.session_state.settings:
-            st.session_state.settings["search"] = {}
-        st.session_state.settings["search"]["engine"] = search_engine
-        st.session_state.settings["search"]["results"] = int(search_results)
-        save_settings(st.session_state.settings)
+        update_setting("search.engine", search_engine)
+        update_setting("search.results", int(search_results))
+        flush_settings()
     
     st.subheader('Prompt Configuration')
     
-    prompt_settings = st.session_state.settings.get("prompt", {})
+    prompt_settings = saved_settings.get("prompt") or _EMPTY
     
     # Fix for handling prompt as string or dict
     if isinstance(prompt_settings, str):
@@ -216,92 +328,91 @@ with st.expander("Basic Configuration", expanded=True):
         height=300
     )
     
-    logfire = st.checkbox("Enable LogFire", st.session_state.settings.get("logfire", False))
+    logfire = st.checkbox("Enable LogFire", saved_settings.get("logfire", False))
     
     if st.button("Save Prompt Settings"):
-        if "prompt" not in st.session_state.settings or isinstance(st.session_state.settings["prompt"], str):
-            st.session_state.settings["prompt"] = {}
-        st.session_state.settings["prompt"]["system"] = system_prompt
-        st.session_state.settings["prompt"]["user"] = user_prompt
-        st.session_state.settings["logfire"] = logfire
-        save_settings(st.session_state.settings)
-
-with st.expander("Output Structure"):
+        update_setting("prompt.system", system_prompt)
+        update_setting("prompt.user", user_prompt)
+        update_setting("logfire", logfire)
+        flush_settings()
+
+if _section_open("Output Structure", "structure"):
     st.header('Output Structure')
-    
-    structure = saved_settings.get("structure", {})
-    
+
+    structure = saved_settings.get("structure") or _EMPTY
+
     # Display existing fields
     st.subheader("Current Fields")
-    
+
     for field_name, field_config in structure.items():
         with st.expander(f"{field_name}: {field_config.get('type', 'str')}"):
             st.text_input(f"Field Type", field_config.get("type", "str"), key=f"type_{field_name}", disabled=True)
             field_desc = st.text_area(f"Description", field_config.get("description", ""), key=f"desc_{field_name}")
             field_config["description"] = field_desc
-            
+
             if "options" in field_config:
                 options_str = "\n".join(field_config["options"])
                 new_options = st.text_area(f"Options (one per line)", options_str, key=f"options_{field_name}")
                 field_config["options"] = [opt for opt in new_options.split("\n") if opt.strip()]
-    
+
     # Add new field UI
     st.subheader("Add New Field")
     col1, col2 = st.columns(2)
-    
+
     with col1:
         new_field_name = st.text_input("Field Name")
-    
+
     with col2:
         new_field_type = st.selectbox("Field Type", ["str", "int", "float", "bool", "list"])
-    
+
     new_field_desc = st.text_area("Field Description")
-    
+
     has_options = st.checkbox("Add Options")
     new_field_options = []
-    
+
     if has_options:
         new_options_str = st.text_area("Options (one per line)")
         new_field_options = [opt for opt in new_options_str.split("\n") if opt.strip()]
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         if st.button("Add Field") and new_field_name:
             if "structure" not in saved_settings:
                 saved_settings["structure"] = {}
-                
+
             saved_settings["structure"][new_field_name] = {
                 "type": new_field_type,
                 "description": new_field_desc
             }
-            
+
             if new_field_options:
                 saved_settings["structure"][new_field_name]["options"] = new_field_options
-                
+
             if save_settings(saved_settings):
                 st.success(f"Field '{new_field_name}' added successfully!")
                 st.experimental_rerun()
-    
+
     with col2:
         # Save structure changes
         if st.button("Save Structure Changes"):
-            if save_settings(saved_settings):
+            if flush_settings():
                 st.success("Structure updated successfully!")
 
-with st.expander("Examples"):
+if _section_open("Examples", "examples"):
     st.header('Examples')
-    
+
     examples = saved_settings.get("examples", [])
-    
+    to_delete = set()
+
     for i, example in enumerate(examples):
         with st.expander(f"Example {i+1}: {example.get('input', 'Unnamed')}"):
             input_val = st.text_input("Input", example.get("input", ""), key=f"ex_input_{i}")
-            output = example.get("output", {})
+            output = example.get("output") or _EMPTY
             example["input"] = input_val
-            
+
             st.subheader("Output")
-            
+
             for field_name, field_value in output.items():
                 if isinstance(field_value, str):
                     new_value = st.text_area(f"{field_name}", field_value, key=f"ex_{i}_{field_name}")
@@ -309,34 +420,39 @@ with st.expander("Examples"):
                 elif isinstance(field_value, (int, float)):
                     new_value = st.number_input(f"{field_name}", value=float(field_value), key=f"ex_{i}_{field_name}")
                     output[field_name] = new_value
-            
+
             if st.button(f"Delete Example #{i+1}", key=f"del_example_{i}"):
-                examples.pop(i)
-                if save_settings(saved_settings):
-                    st.success(f"Example #{i+1} deleted!")
-                    st.experimental_rerun()
-    
+                to_delete.add(i)
+
+    # Delete outside the loop so removing an example doesn't shift the ones still being rendered
+    if to_delete:
+        examples[:] = [e for idx, e in enumerate(examples) if idx not in to_delete]
+        if save_settings(saved_settings):
+            deleted = ", ".join(f"#{idx+1}" for idx in sorted(to_delete))
+            st.success(f"Example {deleted} deleted!")
+            st.experimental_rerun()
+
     # Save examples changes
     if examples and st.button("Save Example Changes"):
-        if save_settings(saved_settings):
+        if flush_settings():
             st.success("Example changes saved successfully!")
-    
+
     # Add new example
     st.subheader("Add New Example")
-    
+
     new_input = st.text_input("Input")
-    
+
     if "structure" in saved_settings:
         structure = saved_settings["structure"]
         new_output = {}
-        
+
         for field_name, field_config in structure.items():
             field_type = field_config.get("type", "str")
-            
+
             if field_type == "str":
                 if "options" in field_config:
                     new_output[field_name] = st.selectbox(
-                        field_name, 
+                        field_name,
                         field_config["options"],
                         key=f"new_example_{field_name}"
                     )
@@ -356,55 +472,57 @@ with st.expander("Examples"):
                     field_name,
                     key=f"new_example_{field_name}"
                 )
-        
+
         if st.button("Add Example") and new_input:
             if "examples" not in saved_settings:
                 saved_settings["examples"] = []
-                
+
             saved_settings["examples"].append({
                 "input": new_input,
                 "output": new_output
             })
-            
+
             if save_settings(saved_settings):
                 st.success("Example added successfully!")
                 st.experimental_rerun()
     else:
         st.info("Define structure fields first before adding examples.")
 
-with st.expander("Advanced Configuration"):
+if _section_open("Advanced Configuration", "advanced"):
     st.header('Advanced Configuration')
-    
+
+    saved_yaml = _dump_yaml(json.dumps(saved_settings, default=str), saved_settings)
+
     # Raw YAML editor
-    raw_yaml = st.text_area("Edit Raw YAML", yaml.dump(saved_settings), height=500)
-    
+    raw_yaml = st.text_area("Edit Raw YAML", saved_yaml, height=500)
+
     if st.button("Save Raw YAML"):
         try:
-            parsed_yaml = yaml.safe_load(raw_yaml)
+            parsed_yaml = yaml.load(raw_yaml, Loader=Loader)
             if save_settings(parsed_yaml):
                 st.success("YAML configuration saved successfully!")
         except Exception as e:
             st.error(f"Error parsing YAML: {e}")
-    
+
     # Export/Import
     st.subheader("Export/Import Configuration")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         if st.download_button(
-            "Download Configuration", 
-            yaml.dump(saved_settings), 
+            "Download Configuration",
+            saved_yaml,
             file_name="augmenta_config.yaml"
         ):
             st.info("Configuration downloaded")
-    
+
     with col2:
         uploaded_config = st.file_uploader("Upload Configuration", type=["yaml", "yml"])
-        
+
         if uploaded_config is not None and st.button("Import Configuration"):
             try:
-                imported_settings = yaml.safe_load(uploaded_config)
+                imported_settings = yaml.load(uploaded_config, Loader=Loader)
                 if save_settings(imported_settings):
                     st.success("Configuration imported successfully!")
                     st.experimental_rerun()
@@ -415,28 +533,22 @@ with st.expander("Advanced Configuration"):
 st.header("Save All Changes")
 if st.button("Save All Configuration", type="primary"):
     # Update all settings
-    st.session_state.settings["input_csv"] = input_csv
-    st.session_state.settings["output_csv"] = output_csv
+    update_setting("input_csv", input_csv)
+    update_setting("output_csv", output_csv)
     
-    if "model" not in st.session_state.settings:
-        st.session_state.settings["model"] = {}
-    st.session_state.settings["model"]["provider"] = model_provider
-    st.session_state.settings["model"]["name"] = model_name
+    update_setting("model.provider", model_provider)
+    update_setting("model.name", model_name)
     
-    if "search" not in st.session_state.settings:
-        st.session_state.settings["search"] = {}
-    st.session_state.settings["search"]["engine"] = search_engine
-    st.session_state.settings["search"]["results"] = int(search_results)
+    update_setting("search.engine", search_engine)
+    update_setting("search.results", int(search_results))
     
-    if "prompt" not in st.session_state.settings or isinstance(st.session_state.settings["prompt"], str):
-        st.session_state.settings["prompt"] = {}
-    st.session_state.settings["prompt"]["system"] = system_prompt
-    st.session_state.settings["prompt"]["user"] = user_prompt
+    update_setting("prompt.system", system_prompt)
+    update_setting("prompt.user", user_prompt)
     
-    st.session_state.settings["logfire"] = logfire
+    update_setting("logfire", logfire)
     
     # Save to file
-    if save_settings(st.session_state.settings):
+    if flush_settings():
         st.balloons()
         st.success("All settings saved successfully!")
 
@@ -444,7 +556,7 @@ if st.button("Save All Configuration", type="primary"):
 st.header("Run Augmenta")
 if st.button("Run", type="primary"):
     # Make sure to save before running
-    update_result = save_settings(st.session_state.settings)
+    update_result = flush_settings()
     if update_result:
         st.info("Starting process with current configuration...")
     else: